@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+
+from starlette.responses import JSONResponse
+
+# Limite per rută: câte request-uri rulează simultan, câte pot aștepta și cât
+DEFAULT_LIMITS = {
+    "/submit-preferences": {"max_in_flight": 16, "max_queue": 64, "queue_timeout_ms": 200},
+    "/analytics/preferences": {"max_in_flight": 4, "max_queue": 8, "queue_timeout_ms": 500},
+    "/analytics/activity-demand": {"max_in_flight": 8, "max_queue": 16, "queue_timeout_ms": 250},
+    "/preferences/export": {"max_in_flight": 2, "max_queue": 4, "queue_timeout_ms": 1000},
+    "/preferences/import": {"max_in_flight": 1, "max_queue": 2, "queue_timeout_ms": 1000},
+}
+# Folosite pentru rutele noi din ADMISSION_LIMITS care nu dau toate cheile
+FALLBACK_LIMITS = {"max_in_flight": 16, "max_queue": 32, "queue_timeout_ms": 200}
+# JSON cu aceeași formă ca DEFAULT_LIMITS; fiecare cheie dată suprascrie doar valoarea ei
+LIMIT_OVERRIDES = json.loads(os.getenv("ADMISSION_LIMITS", "{}"))
+LIMITS = {
+    path: {**FALLBACK_LIMITS, **DEFAULT_LIMITS.get(path, {}), **LIMIT_OVERRIDES.get(path, {})}
+    for path in {**DEFAULT_LIMITS, **LIMIT_OVERRIDES}
+}
+RETRY_AFTER_SECONDS = os.getenv("ADMISSION_RETRY_AFTER", "1")
+
+
+class RouteLimiter:
+    def __init__(self, max_in_flight, max_queue, queue_timeout_ms):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.counters = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_timeout": 0}
+
+    async def acquire(self):
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            return False
+        else:
+            self.waiting += 1
+            self.counters["queued"] += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.counters["shed_timeout"] += 1
+                return False
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        self.counters["admitted"] += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            **self.counters,
+        }
+
+
+limiters = {path: RouteLimiter(**limits) for path, limits in LIMITS.items()}
+
+
+def stats():
+    return {path: limiter.stats() for path, limiter in limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    """Limitează request-urile simultane per rută și respinge surplusul cu 503."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = limiters.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, try again shortly"},
+                headers={"Retry-After": RETRY_AFTER_SECONDS},
+            )
+            return await response(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from models import Preference, PreferenceRollup
+from rollups import hour_bucket
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+async def activity_time_counts(db, start, end, activity=None, time=None):
+    """Numărul de preferințe pe (activitate, time) în intervalul [start, end)."""
+    unnested = func.unnest(Preference.activities).table_valued("activity").render_derived(name="a")
+    query = (
+        select(unnested.c.activity, Preference.time, func.count().label("count"))
+        .select_from(Preference)
+        .join(unnested, true())
+        .where(Preference.created_at >= start, Preference.created_at < end)
+        .group_by(unnested.c.activity, Preference.time)
+        .order_by(func.count().desc())
+    )
+    if activity:
+        # Filtrul pe array folosește indexul GIN, cel pe unnest doar restrânge rezultatul
+        query = query.where(Preference.activities.contains([activity]), unnested.c.activity == activity)
+    if time:
+        query = query.where(Preference.time == time)
+
+    result = await db.execute(query)
+    return [
+        {"activity": row.activity, "time": row.time, "count": row.count}
+        for row in result
+    ]
+
+
+@router.get("/preferences")
+async def preference_counts(
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    activity: Optional[str] = Query(None),
+    time: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    counts = await activity_time_counts(db, start, end, activity, time)
+    return {"start": start, "end": end, "counts": counts}
+
+
+async def activity_demand(db, since):
+    """Cererea pe (activitate, time) citită din rollup-urile orare, fără scan pe preferences."""
+    query = (
+        select(
+            PreferenceRollup.activity,
+            PreferenceRollup.time,
+            func.sum(PreferenceRollup.count).label("count"),
+        )
+        .where(PreferenceRollup.bucket >= since)
+        .group_by(PreferenceRollup.activity, PreferenceRollup.time)
+        .order_by(func.sum(PreferenceRollup.count).desc())
+    )
+    result = await db.execute(query)
+    return [
+        {"activity": row.activity, "time": row.time, "count": row.count}
+        for row in result
+    ]
+
+
+@router.get("/activity-demand")
+async def activity_demand_last_days(
+    days: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_db),
+):
+    # Rollup-urile sunt pe ore: aliniem începutul ca prima oră să fie numărată întreagă, nu deloc
+    since = hour_bucket(datetime.now(timezone.utc) - timedelta(days=days))
+    return {"since": since, "demand": await activity_demand(db, since)}
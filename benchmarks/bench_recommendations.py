@@ -0,0 +1,77 @@
+"""Micro-benchmark: CPU time per /submit-preferences recommendation step.
+
+Compară implementarea veche (dict reconstruit la fiecare request + filtrare
+pe substring) cu lookup-ul în indexul precompilat din recommendations.py.
+
+    python benchmarks/bench_recommendations.py [iterations]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommendations import get_recommendations, reload_index  # noqa: E402
+
+ACTIVITIES = ["Cultural", "Outdoor", "Relaxation", "Gastronomy"]
+TIMES = ["<2h", "2-4h", ">4h"]
+
+
+def legacy_recommendations(activities, time):
+    all_recommendations = {
+        "Cultural": ["Visit the local art museum", "Attend a history tour"],
+        "Outdoor": ["Explore a nature park", "Go hiking in nearby hills"],
+        "Relaxation": ["Try a spa experience", "Relax in a botanical garden"],
+        "Gastronomy": ["Take a food tour", "Join a local cooking class"],
+    }
+
+    recommendations = []
+
+    for activity in activities:
+        if activity in all_recommendations:
+            recommendations.extend(all_recommendations[activity])
+
+    if time == "<2h":
+        recommendations = [rec for rec in recommendations if "tour" in rec or "museum" in rec]
+
+    if not recommendations:
+        recommendations = ["No matching recommendations found. Try selecting more preferences."]
+
+    return recommendations
+
+
+def make_payloads(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        (rng.sample(ACTIVITIES, rng.randint(1, len(ACTIVITIES))), rng.choice(TIMES))
+        for _ in range(count)
+    ]
+
+
+def measure(fn, payloads):
+    start = time.process_time_ns()
+    for activities, t in payloads:
+        fn(activities, t)
+    return (time.process_time_ns() - start) / len(payloads)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    payloads = make_payloads(iterations)
+    reload_index()
+
+    for activities, t in payloads[:1000]:
+        assert legacy_recommendations(activities, t) == get_recommendations(activities, t)
+
+    legacy_ns = measure(legacy_recommendations, payloads)
+    indexed_ns = measure(get_recommendations, payloads)
+
+    print(f"requests:        {iterations}")
+    print(f"legacy:          {legacy_ns / 1000:.3f} us CPU/request")
+    print(f"precompiled:     {indexed_ns / 1000:.3f} us CPU/request")
+    print(f"speedup:         {legacy_ns / indexed_ns:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
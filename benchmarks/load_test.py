@@ -0,0 +1,251 @@
+"""Load test pentru aplicația FastAPI, cu o bază de date locală.
+
+Trimite un amestec realist de payload-uri /submit-preferences fie in-process
+(httpx + ASGI transport), fie printr-un uvicorn real, și raportează latența
+p50/p95/p99, throughput-ul și alocările de memorie per request. Rezultatele se
+salvează în benchmarks/results/ și sunt comparate cu rularea anterioară cu
+aceeași configurație.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/load_test.py --transport both --requests 2000 --concurrency 32
+
+Pe lângă dependențele aplicației are nevoie de httpx (clientul de load) și
+aiosqlite (driverul SQLite implicit), declarate în benchmarks/requirements.txt.
+
+Implicit folosește un fișier SQLite temporar (sqlite+aiosqlite); pentru un
+Postgres local efemer dă --database-url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+ACTIVITIES = ["Cultural", "Outdoor", "Relaxation", "Gastronomy"]
+TIMES = ["<2h", "2-4h", ">4h"]
+# Ponderi aproximative din răspunsurile la chestionar
+ACTIVITY_WEIGHTS = [0.35, 0.25, 0.15, 0.25]
+TIME_WEIGHTS = [0.35, 0.40, 0.25]
+SELECTION_SIZE_WEIGHTS = [0.45, 0.35, 0.15, 0.05]
+
+
+def make_payloads(count, seed):
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        size = rng.choices([1, 2, 3, 4], SELECTION_SIZE_WEIGHTS)[0]
+        chosen = []
+        while len(chosen) < size:
+            activity = rng.choices(ACTIVITIES, ACTIVITY_WEIGHTS)[0]
+            if activity not in chosen:
+                chosen.append(activity)
+        payloads.append({"activities": chosen, "time": rng.choices(TIMES, TIME_WEIGHTS)[0]})
+    return payloads
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms, wall_seconds, errors):
+    latencies_ms = sorted(latencies_ms)
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "throughput_rps": round(len(latencies_ms) / wall_seconds, 1) if wall_seconds else None,
+        "p50_ms": round(percentile(latencies_ms, 0.50), 3),
+        "p95_ms": round(percentile(latencies_ms, 0.95), 3),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 3),
+        "max_ms": round(latencies_ms[-1], 3),
+    }
+
+
+async def drive(client, payloads, concurrency):
+    latencies = []
+    errors = 0
+    queue = iter(payloads)
+
+    async def worker():
+        nonlocal errors
+        for payload in queue:
+            started = time.perf_counter()
+            response = await client.post("/submit-preferences", json=payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def measure_allocations(client, payloads):
+    """Rulare secvențială cu tracemalloc: vârful și memoria reținută per request."""
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for payload in payloads:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await client.post("/submit-preferences", json=payload)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_bytes_per_request": round(sum(peaks) / len(peaks)),
+        "alloc_retained_bytes_per_request": round(sum(retained) / len(retained)),
+    }
+
+
+async def run_asgi(args, payloads):
+    import httpx
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await drive(client, payloads[:args.warmup], args.concurrency)
+            result = await drive(client, payloads[args.warmup:], args.concurrency)
+            result.update(await measure_allocations(client, payloads[:args.alloc_requests]))
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args, payloads):
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            for _ in range(200):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            await drive(client, payloads[:args.warmup], args.concurrency)
+            return await drive(client, payloads[args.warmup:], args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def config_key(args, transport):
+    return {
+        "transport": transport,
+        "database": args.database_url.split(":", 1)[0],
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "write_mode": os.environ.get("PREFERENCES_WRITE_MODE", "sync"),
+    }
+
+
+def previous_result(config):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    for name in sorted(os.listdir(RESULTS_DIR), reverse=True):
+        with open(os.path.join(RESULTS_DIR, name), encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored["config"] == config:
+            return stored
+    return None
+
+
+def report(config, result, previous):
+    print(f"\n[{config['transport']}] {config['database']} write_mode={config['write_mode']} "
+          f"requests={config['requests']} concurrency={config['concurrency']}")
+    for metric, value in result.items():
+        line = f"  {metric:34} {value}"
+        if previous and isinstance(value, (int, float)) and previous["result"].get(metric):
+            before = previous["result"][metric]
+            line += f"   ({(value - before) / before * 100:+.1f}% vs {previous['revision']})"
+        print(line)
+
+
+def save(config, result):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    revision = git_revision()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{config['transport']}-{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"revision": revision, "recorded_at": stamp, "config": config, "result": result}, f, indent=2)
+    return path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transport", choices=["asgi", "uvicorn", "both"], default="asgi")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--alloc-requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--no-save", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="citytailor-bench-"), "bench.db")
+        args.database_url = f"sqlite+aiosqlite:///{path}?timeout=30"
+    # Trebuie setate înainte de importul aplicației (database.py citește env la import)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DB_BOOTSTRAP_SCHEMA", "1")
+    sys.path.insert(0, ROOT)
+
+    payloads = make_payloads(args.requests + args.warmup, args.seed)
+    transports = ["asgi", "uvicorn"] if args.transport == "both" else [args.transport]
+    for transport in transports:
+        runner = run_asgi if transport == "asgi" else run_uvicorn
+        result = asyncio.run(runner(args, payloads))
+        config = config_key(args, transport)
+        report(config, result, previous_result(config))
+        if not args.no_save:
+            print(f"  saved to {os.path.relpath(save(config, result), ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
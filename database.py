@@ -1,12 +1,56 @@
 #pw : 8U97aH9pgL08GVDy
+import asyncio
 import os
-from sqlalchemy.ext.asyncio import create_async_engine
+from contextlib import AsyncExitStack
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from dotenv import load_dotenv
+from sql_metrics import instrument
 load_dotenv()
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# echo scrie fiecare statement pe stdout; pentru vizibilitate folosește /metrics
+SQL_ECHO = os.getenv("SQL_ECHO", "0") == "1"
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Câte conexiuni deschidem la pornire (maxim POOL_SIZE rămân în pool)
+PREWARM_CONNECTIONS = min(int(os.getenv("DB_PREWARM_CONNECTIONS", str(POOL_SIZE))), POOL_SIZE)
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=SQL_ECHO,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=3600
+)
+instrument(engine)
 Base = declarative_base()
+
+async_session = async_sessionmaker(
+    engine,
+    expire_on_commit=False,
+    class_=AsyncSession
+)
+
+async def get_db():
+    async with async_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def prewarm_pool(connections=PREWARM_CONNECTIONS):
+    """Deschide conexiunile simultan, rulează un query de încălzire și le lasă în pool."""
+    if connections <= 0:
+        return 0
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(*(
+            stack.enter_async_context(engine.connect()) for _ in range(connections)
+        ))
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+    return len(conns)
@@ -1,9 +1,30 @@
 import asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from database import engine, Base
+from models import Preference
+
+
+def migrate_preferences(sync_conn):
+    """Convertește activities din string separat prin virgulă în ARRAY și adaugă indexurile."""
+    if sync_conn.dialect.name != "postgresql":
+        return
+    columns = {c["name"]: c["type"] for c in inspect(sync_conn).get_columns("preferences")}
+    if "activities" in columns and not isinstance(columns["activities"], ARRAY):
+        sync_conn.execute(text(
+            "ALTER TABLE preferences ALTER COLUMN activities TYPE varchar[] USING "
+            "CASE WHEN activities IS NULL OR activities = '' THEN '{}'::varchar[] "
+            "ELSE string_to_array(activities, ', ') END"
+        ))
+    # create_all nu adaugă indexuri noi pe tabele existente
+    for index in Preference.__table__.indexes:
+        index.create(sync_conn, checkfirst=True)
+
 
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrate_preferences)
 
 if __name__ == "__main__":
     asyncio.run(init_db())
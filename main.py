@@ -1,20 +1,72 @@
-from fastapi import FastAPI, Request, Depends
+import os
+import time as clock
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Preference
+from database import get_db, prewarm_pool
 from init_db import init_db  # 👈 importat pentru ruta /init-db
+import recommendations
+from recommendations import reload_index
+from preference_writer import preference_writer, insert_preferences, preference_row, QueueFull, WriterClosed, WRITE_MODE
+from rollups import rollup_buffer
+import sql_metrics
+import admission
+from analytics import router as analytics_router
+from preference_transfer import router as preference_transfer_router
+
+# Creează/verifică schema la pornire în loc să aștepte un GET /init-db
+BOOTSTRAP_SCHEMA = os.getenv("DB_BOOTSTRAP_SCHEMA", "1") == "1"
+
+startup_timings = {}
+
+@asynccontextmanager
+async def timed_phase(name):
+    started = clock.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round((clock.perf_counter() - started) * 1000, 2)
+        print(f"Startup phase {name}: {startup_timings[name]} ms")
+
+@asynccontextmanager
+async def lifespan(app):
+    async with timed_phase("total"):
+        if BOOTSTRAP_SCHEMA:
+            async with timed_phase("schema"):
+                await init_db()
+        async with timed_phase("pool_prewarm"):
+            await prewarm_pool()
+        async with timed_phase("recommendation_index"):
+            reload_index()
+        async with timed_phase("rollup_buffer"):
+            await rollup_buffer.start()
+        if WRITE_MODE == "write-behind":
+            async with timed_phase("preference_writer"):
+                await preference_writer.start()
+    yield
+    await preference_writer.stop()
+    # După writer: rândurile scrise sincron în timp ce acesta se golea trec tot prin buffer
+    await rollup_buffer.stop()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
+# Adăugat înaintea CORS ca răspunsurile 503 să primească și ele headerele CORS
+app.add_middleware(admission.AdmissionControlMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # modifică dacă frontend-ul e hostat în altă parte
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
+app.add_middleware(sql_metrics.EndpointContextMiddleware)
+
+app.include_router(analytics_router)
+app.include_router(preference_transfer_router)
 
 @app.get("/")
 def home():
@@ -31,32 +83,55 @@ async def submit_preferences(request: Request, db: AsyncSession = Depends(get_db
     activities = data.get("activities", [])
     time = data.get("time", "")
 
-    new_pref = Preference(
-        activities=", ".join(activities),
-        time=time
-    )
-    db.add(new_pref)
-    await db.commit()
-
-    all_recommendations = {
-        "Cultural": ["Visit the local art museum", "Attend a history tour"],
-        "Outdoor": ["Explore a nature park", "Go hiking in nearby hills"],
-        "Relaxation": ["Try a spa experience", "Relax in a botanical garden"],
-        "Gastronomy": ["Take a food tour", "Join a local cooking class"],
-    }
-
-    recommendations = []
+    try:
+        row = preference_row(activities, time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    for activity in activities:
-        if activity in all_recommendations:
-            recommendations.extend(all_recommendations[activity])
+    record_started = clock.perf_counter()
+    try:
+        await preference_writer.submit(row)
+    except QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many pending preferences, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    except WriterClosed:
+        # Mod sync, sau writer-ul se oprește și își golește coada
+        conn = await db.connection()
+        await insert_preferences(conn, [row], rollups=False)
+        await db.commit()
+        rollup_buffer.add([row])
 
-    if time == "<2h":
-        recommendations = [rec for rec in recommendations if "tour" in rec or "museum" in rec]
+    recommend_started = clock.perf_counter()
+    # Răspunsul e determinist pentru (activități, time): îl servim gata serializat
+    body, etag = recommendations.cached_response(row["activities"], row["time"])
+    finished = clock.perf_counter()
 
-    if not recommendations:
-        recommendations = ["No matching recommendations found. Try selecting more preferences."]
+    headers = {
+        "ETag": etag,
+        "Server-Timing": (
+            f"record;dur={(recommend_started - record_started) * 1000:.2f}, "
+            f"recommend;dur={(finished - recommend_started) * 1000:.2f}"
+        ),
+    }
+    if recommendations.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    print("Generated recommendations:", recommendations)
+@app.post("/recommendations/reload")
+async def reload_recommendations():
+    entries = reload_index()
+    return {"status": "Recommendation index reloaded", "entries": entries}
 
-    return {"recommendations": recommendations}
+@app.get("/metrics")
+async def metrics():
+    return {
+        "sql": sql_metrics.snapshot(),
+        "preference_writer": preference_writer.stats(),
+        "rollup_buffer": rollup_buffer.stats(),
+        "recommendation_cache": recommendations.cache_stats(),
+        "admission": admission.stats(),
+        "startup_ms": startup_timings,
+    }
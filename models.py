@@ -1,10 +1,27 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, text
+from sqlalchemy import Column, Integer, String, JSON, TIMESTAMP, Index, func
+from sqlalchemy.dialects.postgresql import ARRAY
 from database import Base
 
 class Preference(Base):
     __tablename__ = "preferences"
+    __table_args__ = (
+        # GIN pentru filtre de tip activities @> ARRAY['Gastronomy']
+        Index("ix_preferences_activities", "activities", postgresql_using="gin"),
+        Index("ix_preferences_time_created_at", "time", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
-    activities = Column(String)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), index=True)
+    # JSON pe SQLite, pentru rulări locale (benchmarks/load_test.py)
+    activities = Column(ARRAY(String).with_variant(JSON(), "sqlite"))
     time = Column(String)
+
+
+class PreferenceRollup(Base):
+    """Numărul de preferințe pe oră pentru fiecare combinație (activitate, time)."""
+    __tablename__ = "preference_rollups"
+
+    bucket = Column(TIMESTAMP(timezone=True), primary_key=True)
+    activity = Column(String, primary_key=True)
+    time = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from database import async_session, engine
+from models import Preference
+from preference_writer import insert_preferences, preference_row
+
+router = APIRouter(prefix="/preferences", tags=["preferences"])
+
+EXPORT_BATCH_SIZE = int(os.getenv("PREFERENCES_EXPORT_BATCH_SIZE", "5000"))
+IMPORT_BATCH_SIZE = int(os.getenv("PREFERENCES_IMPORT_BATCH_SIZE", "5000"))
+
+CSV_COLUMNS = ["id", "created_at", "activities", "time"]
+# Separatorul activităților într-o celulă CSV
+CSV_ACTIVITY_SEPARATOR = "|"
+
+
+def _to_record(pref):
+    return {
+        "id": pref.id,
+        "created_at": pref.created_at.isoformat() if pref.created_at else None,
+        "activities": list(pref.activities or []),
+        "time": pref.time,
+    }
+
+
+def _format_ndjson(records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def _format_csv(records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([
+            record["id"],
+            record["created_at"],
+            CSV_ACTIVITY_SEPARATOR.join(record["activities"]),
+            record["time"],
+        ])
+    return buffer.getvalue()
+
+
+async def _export_pages(fmt, after_id, batch_size):
+    """Keyset pagination pe id; fiecare pagină e citită printr-un cursor server-side."""
+    formatter = _format_csv if fmt == "csv" else _format_ndjson
+    if fmt == "csv":
+        yield ",".join(CSV_COLUMNS) + "\r\n"
+
+    last_id = after_id
+    async with async_session() as session:
+        while True:
+            query = (
+                select(Preference)
+                .where(Preference.id > last_id)
+                .order_by(Preference.id)
+                .limit(batch_size)
+            )
+            records = []
+            result = await session.stream_scalars(query)
+            async for pref in result:
+                records.append(_to_record(pref))
+            # O tranzacție scurtă pe pagină și identity map gol între pagini
+            await session.commit()
+            session.expunge_all()
+
+            if records:
+                last_id = records[-1]["id"]
+                yield formatter(records)
+            if len(records) < batch_size:
+                break
+
+
+@router.get("/export")
+async def export_preferences(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    after_id: int = Query(0, ge=0),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=50000),
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(_export_pages(format, after_id, batch_size), media_type=media_type)
+
+
+def _parse_ndjson(line):
+    record = json.loads(line)
+    return record.get("created_at"), record.get("activities") or [], record.get("time")
+
+
+def _parse_csv(line):
+    values = next(csv.reader([line]))
+    if values == CSV_COLUMNS:
+        return None
+    _, created_at, activities, time = values
+    return created_at or None, [a for a in activities.split(CSV_ACTIVITY_SEPARATOR) if a], time
+
+
+def _to_row(parsed):
+    created_at, activities, time = parsed
+    if created_at:
+        created_at = datetime.fromisoformat(created_at)
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        else:
+            created_at = created_at.astimezone(timezone.utc)
+    else:
+        created_at = datetime.now(timezone.utc)
+    # Aceeași validare și deduplicare ca pentru /submit-preferences
+    return {**preference_row(activities, time), "created_at": created_at}
+
+
+async def _lines(request):
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def _write_batch(rows):
+    async with engine.begin() as conn:
+        await insert_preferences(conn, rows)
+
+
+@router.post("/import")
+async def import_preferences(request: Request):
+    """Importă un upload NDJSON sau CSV (după Content-Type) în batch-uri, fără să-l țină în memorie."""
+    parse = _parse_csv if "csv" in request.headers.get("content-type", "") else _parse_ndjson
+    imported = 0
+    batches = 0
+    batch = []
+    line_number = 0
+
+    async for raw_line in _lines(request):
+        line_number += 1
+        line = raw_line.decode("utf-8").strip()
+        if not line:
+            continue
+        try:
+            parsed = parse(line)
+            if parsed is None:
+                continue
+            batch.append(_to_row(parsed))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid record on line {line_number}: {e}. {imported} rows were imported before it.",
+            )
+
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _write_batch(batch)
+            imported += len(batch)
+            batches += 1
+            batch = []
+
+    if batch:
+        await _write_batch(batch)
+        imported += len(batch)
+        batches += 1
+
+    return {"imported": imported, "batches": batches}
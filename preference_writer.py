@@ -0,0 +1,257 @@
+import asyncio
+import os
+import time as clock
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from database import engine
+from models import Preference
+from rollups import apply_rollups
+import sql_metrics
+from sql_metrics import current_endpoint
+
+# "sync": fiecare request face propriul commit (comportamentul inițial)
+# "write-behind": preferințele intră într-o coadă și sunt scrise în batch-uri
+WRITE_MODE = os.getenv("PREFERENCES_WRITE_MODE", "sync")
+BATCH_SIZE = int(os.getenv("PREFERENCES_BATCH_SIZE", "500"))
+FLUSH_INTERVAL_MS = int(os.getenv("PREFERENCES_FLUSH_INTERVAL_MS", "200"))
+QUEUE_SIZE = int(os.getenv("PREFERENCES_QUEUE_SIZE", "10000"))
+# Cât așteaptă un request după un loc în coadă înainte să fie refuzat
+ENQUEUE_TIMEOUT_MS = int(os.getenv("PREFERENCES_ENQUEUE_TIMEOUT_MS", "100"))
+# "buffered": răspundem imediat ce rândul e în coadă (se pierde la crash)
+# "flushed": requestul așteaptă commit-ul batch-ului din care face parte
+DURABILITY = os.getenv("PREFERENCES_DURABILITY", "buffered")
+USE_COPY = os.getenv("PREFERENCES_USE_COPY", "1") == "1"
+# De câte ori reîncercăm un batch eșuat (cu backoff dublat) înainte să-l împărțim
+FLUSH_RETRIES = int(os.getenv("PREFERENCES_FLUSH_RETRIES", "3"))
+FLUSH_RETRY_BACKOFF_MS = int(os.getenv("PREFERENCES_FLUSH_RETRY_BACKOFF_MS", "200"))
+
+COPY_COLUMNS = ["created_at", "activities", "time"]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WriterClosed(Exception):
+    """Writer-ul nu rulează sau se oprește; rândul trebuie scris direct."""
+
+
+def preference_row(activities, time):
+    """Rândul de inserat; ValueError dacă payload-ul nu are forma așteptată."""
+    if activities is None:
+        activities = []
+    if not isinstance(activities, list) or not all(isinstance(a, str) for a in activities):
+        raise ValueError("activities must be a list of strings")
+    if time is not None and not isinstance(time, str):
+        raise ValueError("time must be a string")
+    return {
+        "created_at": datetime.now(timezone.utc),
+        # Fără duplicate, în ordinea primei apariții: rollup-urile și unnest-ul din analytics numără la fel
+        "activities": list(dict.fromkeys(activities)),
+        "time": time,
+    }
+
+
+async def insert_preferences(conn, rows, rollups=True):
+    """Scrie toate rândurile într-un singur statement (COPY pe asyncpg) și, pentru batch-uri, actualizează rollup-urile.
+
+    Cu rollups=False apelantul le trece prin rollup_buffer după commit, ca un
+    request singur să nu țină lock pe rândurile fierbinți din preference_rollups.
+    """
+    if not rows:
+        return
+    # Rollup-urile primele: adaptorul asyncpg trimite BEGIN abia la primul statement
+    # prin SQLAlchemy, iar COPY-ul de mai jos trebuie să intre în tranzacția aceea
+    if rollups:
+        await apply_rollups(conn, rows)
+    if USE_COPY and len(rows) > 1 and conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        driver_connection = raw.driver_connection
+        # Savepoint în tranzacția deschisă; tranzacție proprie dacă nu a existat niciun upsert
+        started = clock.perf_counter()
+        async with driver_connection.transaction():
+            await driver_connection.copy_records_to_table(
+                Preference.__tablename__,
+                records=[tuple(row[column] for column in COPY_COLUMNS) for row in rows],
+                columns=COPY_COLUMNS,
+            )
+        # COPY ocolește evenimentele de cursor, îl înregistrăm explicit
+        sql_metrics.record(
+            f"COPY {Preference.__tablename__} ({', '.join(COPY_COLUMNS)})",
+            (clock.perf_counter() - started) * 1000,
+            len(rows),
+        )
+    else:
+        await conn.execute(insert(Preference).values(rows))
+
+
+class PreferenceWriter:
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval_ms=FLUSH_INTERVAL_MS,
+                 queue_size=QUEUE_SIZE, enqueue_timeout_ms=ENQUEUE_TIMEOUT_MS,
+                 durability=DURABILITY, flush_retries=FLUSH_RETRIES,
+                 flush_retry_backoff_ms=FLUSH_RETRY_BACKOFF_MS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.durability = durability
+        self.flush_retries = flush_retries
+        self.flush_retry_backoff = flush_retry_backoff_ms / 1000
+        self.queue = None
+        self._task = None
+        self._stopping = None
+        self._closed = False
+        # Request-uri care au trecut de verificarea _closed dar nu au pus încă rândul în coadă
+        self._pending_puts = 0
+        self.counters = {
+            "enqueued": 0,
+            "rejected": 0,
+            "flushed_rows": 0,
+            "flushed_batches": 0,
+            "flush_retries": 0,
+            "failed_rows": 0,
+        }
+
+    @property
+    def running(self):
+        return self._task is not None and not self._closed
+
+    async def start(self):
+        if self._task is None:
+            self._closed = False
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Oprește worker-ul după ce scrie tot ce a rămas în coadă."""
+        if self._task is None:
+            return
+        # Request-urile noi primesc WriterClosed și trec pe calea sincronă cât timp golim coada
+        self._closed = True
+        task, self._task = self._task, None
+        # Fără cancel(): pe 3.11 wait_for poate înghiți anularea și task-ul nu se mai termină
+        self._stopping.set()
+        await task
+
+    async def submit(self, row):
+        """Pune în coadă un rând din preference_row(); WriterClosed dacă writer-ul nu rulează sau se oprește."""
+        if not self.running:
+            raise WriterClosed()
+        done = asyncio.get_running_loop().create_future() if self.durability == "flushed" else None
+        # Golirea de la stop() așteaptă și put-urile în curs, nu doar ce e deja în coadă
+        self._pending_puts += 1
+        try:
+            await asyncio.wait_for(self.queue.put((row, done)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["rejected"] += 1
+            raise QueueFull()
+        finally:
+            self._pending_puts -= 1
+        self.counters["enqueued"] += 1
+        if done is not None:
+            await done
+
+    def stats(self):
+        return {
+            "mode": WRITE_MODE,
+            "durability": self.durability,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            **self.counters,
+        }
+
+    async def _next(self, timeout=None):
+        """Următorul element din coadă, sau None la timeout ori la stop."""
+        get = asyncio.ensure_future(self.queue.get())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait({get, stopping}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        # Dacă get() s-a terminat între timp, cancel() nu are efect și primim elementul
+        get.cancel()
+        try:
+            return await get
+        except asyncio.CancelledError:
+            return None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopping.is_set():
+            item = await self._next()
+            if item is None:
+                continue
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                # Ce e deja în coadă luăm direct, fără să așteptăm
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                item = await self._next(timeout)
+                if item is None:
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Fiecare get_nowait eliberează un loc pentru un put parcat, deci verificăm
+        # din nou după fiecare flush până nu mai e nimic în coadă sau pe drum spre ea
+        while not self.queue.empty() or self._pending_puts:
+            if self.queue.empty():
+                await asyncio.sleep(0)
+                continue
+            batch = []
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        if not batch:
+            return
+        current_endpoint.set("preference_writer")
+        backoff = self.flush_retry_backoff
+        for attempt in range(self.flush_retries + 1):
+            try:
+                await self._write(batch)
+                return
+            except Exception as e:
+                error = e
+                if attempt < self.flush_retries:
+                    print(f"Preferences batch flush failed, retrying in {backoff:.2f}s:", e)
+                    self.counters["flush_retries"] += 1
+                    await asyncio.sleep(backoff)
+                    backoff *= 2
+        print(f"Preferences batch of {len(batch)} failed {self.flush_retries + 1} times, splitting it:", error)
+        await self._split(batch, error)
+
+    async def _split(self, batch, error):
+        """Înjumătățim batch-ul eșuat ca un rând invalid să nu ia cu el și rândurile bune."""
+        if len(batch) == 1:
+            print("Dropping preference after failed flush:", error)
+            self.counters["failed_rows"] += 1
+            _, done = batch[0]
+            if done is not None and not done.done():
+                done.set_exception(error)
+            return
+        middle = len(batch) // 2
+        for half in (batch[:middle], batch[middle:]):
+            # Fără reîncercări aici: erorile trecătoare au avut deja backoff-ul din _flush
+            try:
+                await self._write(half)
+            except Exception as e:
+                await self._split(half, e)
+
+    async def _write(self, batch):
+        async with engine.begin() as conn:
+            await insert_preferences(conn, [row for row, _ in batch])
+        self.counters["flushed_rows"] += len(batch)
+        self.counters["flushed_batches"] += 1
+        for _, done in batch:
+            if done is not None and not done.done():
+                done.set_result(None)
+
+preference_writer = PreferenceWriter()
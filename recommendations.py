@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Catalogul implicit de recomandări (activitate -> recomandări)
+DEFAULT_CATALOG = {
+    "Cultural": ["Visit the local art museum", "Attend a history tour"],
+    "Outdoor": ["Explore a nature park", "Go hiking in nearby hills"],
+    "Relaxation": ["Try a spa experience", "Relax in a botanical garden"],
+    "Gastronomy": ["Take a food tour", "Join a local cooking class"],
+}
+
+# Pentru "<2h" păstrăm doar recomandările scurte (tururi și muzee)
+SHORT_TIME = "<2h"
+SHORT_KEYWORDS = ("tour", "museum")
+
+# Fișier JSON opțional cu același format ca DEFAULT_CATALOG
+CATALOG_PATH = os.getenv("RECOMMENDATIONS_CATALOG_PATH")
+
+# Câte combinații (activități, time bucket) păstrăm serializate
+RESPONSE_CACHE_SIZE = int(os.getenv("RECOMMENDATIONS_CACHE_SIZE", "1024"))
+
+NO_MATCH = ["No matching recommendations found. Try selecting more preferences."]
+
+_index = {}
+_reload_lock = threading.Lock()
+_response_cache = OrderedDict()
+_cache_counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def time_bucket(time):
+    return "short" if time == SHORT_TIME else "any"
+
+
+def load_catalog():
+    if not CATALOG_PATH:
+        return DEFAULT_CATALOG
+    with open(CATALOG_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_index(catalog):
+    """(activitate, time bucket) -> tuple de recomandări, calculat o singură dată."""
+    index = {}
+    for activity, recs in catalog.items():
+        index[(activity, "any")] = tuple(recs)
+        index[(activity, "short")] = tuple(
+            rec for rec in recs if any(keyword in rec for keyword in SHORT_KEYWORDS)
+        )
+    return index
+
+
+def reload_index():
+    """Reconstruiește indexul din catalog și îl înlocuiește atomic."""
+    global _index
+    with _reload_lock:
+        _index = build_index(load_catalog())
+        _response_cache.clear()
+    return len(_index)
+
+
+def get_recommendations(activities, time):
+    bucket = time_bucket(time)
+    index = _index
+    recommendations = []
+    for activity in activities:
+        recs = index.get((activity, bucket))
+        if recs:
+            recommendations.extend(recs)
+    return recommendations or list(NO_MATCH)
+
+
+def normalize(activities, time):
+    """Cheia canonică: setul sortat de activități și time bucket-ul."""
+    return tuple(sorted({a for a in activities if isinstance(a, str)})), time_bucket(time)
+
+
+def cached_response(activities, time):
+    """Întoarce (body JSON serializat, ETag) pentru cerere, din cache LRU când se poate."""
+    key = normalize(activities, time)
+    entry = _response_cache.get(key)
+    if entry is not None:
+        _response_cache.move_to_end(key)
+        _cache_counters["hits"] += 1
+        return entry
+
+    _cache_counters["misses"] += 1
+    body = json.dumps({"recommendations": get_recommendations(key[0], time)}).encode("utf-8")
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    entry = _response_cache[key] = (body, etag)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+        _cache_counters["evictions"] += 1
+    return entry
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def cache_stats():
+    return {"size": len(_response_cache), "max_size": RESPONSE_CACHE_SIZE, **_cache_counters}
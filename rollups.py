@@ -0,0 +1,109 @@
+import asyncio
+import os
+from collections import Counter
+from datetime import timezone
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import engine
+from models import PreferenceRollup
+from sql_metrics import current_endpoint
+
+# Cât stau în memorie contoarele rândurilor scrise pe calea sincronă (se pierd la crash)
+ROLLUP_FLUSH_INTERVAL_MS = int(os.getenv("ROLLUP_FLUSH_INTERVAL_MS", "1000"))
+
+
+def hour_bucket(ts):
+    """Începutul orei în UTC (un offset ca +05:30 nu ar cădea pe limită de oră)."""
+    ts = ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def aggregate(rows):
+    counts = Counter()
+    for row in rows:
+        bucket = hour_bucket(row["created_at"])
+        time = row["time"] or ""
+        # Activitățile sunt deduplicate la scriere, ca în unnest-ul din /analytics/preferences
+        for activity in row["activities"] or ():
+            counts[(bucket, activity, time)] += 1
+    return counts
+
+
+async def apply_rollups(conn, rows):
+    """Adună rândurile noi în rollup-uri, în aceeași tranzacție cu insert-ul."""
+    await upsert_counts(conn, aggregate(rows))
+
+
+async def upsert_counts(conn, counts):
+    if not counts:
+        return
+    insert = pg_insert if conn.dialect.name == "postgresql" else sqlite_insert
+    # Ordine fixă a cheilor ca upsert-urile concurente să nu intre în deadlock
+    stmt = insert(PreferenceRollup).values([
+        {"bucket": bucket, "activity": activity, "time": time, "count": count}
+        for (bucket, activity, time), count in sorted(counts.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PreferenceRollup.bucket, PreferenceRollup.activity, PreferenceRollup.time],
+        set_={"count": PreferenceRollup.count + stmt.excluded["count"]},
+    )
+    await conn.execute(stmt)
+
+
+class RollupBuffer:
+    """Rollup-urile pentru rândurile scrise câte unul: un upsert per interval, nu per request."""
+
+    def __init__(self, flush_interval_ms=ROLLUP_FLUSH_INTERVAL_MS):
+        self.flush_interval = flush_interval_ms / 1000
+        self.counts = Counter()
+        self._task = None
+        self._stopping = None
+        self.counters = {"buffered_rows": 0, "flushes": 0, "failed_flushes": 0}
+
+    def add(self, rows):
+        self.counts.update(aggregate(rows))
+        self.counters["buffered_rows"] += len(rows)
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Oprește flush-ul periodic după ce scrie contoarele rămase."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._stopping.set()
+        await task
+
+    def stats(self):
+        return {"pending_keys": len(self.counts), **self.counters}
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        counts, self.counts = self.counts, Counter()
+        if not counts:
+            return
+        current_endpoint.set("rollup_buffer")
+        try:
+            async with engine.begin() as conn:
+                await upsert_counts(conn, counts)
+        except Exception as e:
+            print("Rollup flush failed, keeping the counts for the next one:", e)
+            self.counters["failed_flushes"] += 1
+            self.counts.update(counts)
+            return
+        self.counters["flushes"] += 1
+
+
+rollup_buffer = RollupBuffer()
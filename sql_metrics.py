@@ -0,0 +1,172 @@
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Limitele bucket-urilor de latență, în milisecunde
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Statement-urile sunt parametrizate, deci textul e stabil; limităm totuși memoria
+MAX_TRACKED_STATEMENTS = int(os.getenv("SQL_METRICS_MAX_STATEMENTS", "500"))
+# 0 dezactivează logarea query-urilor lente
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SQL_SLOW_QUERY_SAMPLE_RATE", "1.0"))
+
+current_endpoint = ContextVar("current_endpoint", default="-")
+
+# insert(...).values(rows) și upsert-ul de rollup generează un grup VALUES per rând;
+# le reducem la primul grup ca fiecare mărime de batch să nu devină alt statement
+_VALUES_GROUPS = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+
+def normalize_statement(statement):
+    return _VALUES_GROUPS.sub(r"\1, ...", " ".join(statement.split()))
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        # Statement-uri al căror număr de rânduri nu se știe la execute (cursoare server-side)
+        self.rows_unknown = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms, rows):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows is None:
+            self.rows_unknown += 1
+        elif rows > 0:
+            self.rows += rows
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, q):
+        """Estimare: limita superioară a bucket-ului în care cade percentila."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, hits in enumerate(self.buckets[:-1]):
+            seen += hits
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i]
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "rows": self.rows,
+            "rows_unknown": self.rows_unknown,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets_ms": dict(zip([*map(str, LATENCY_BUCKETS_MS), "+Inf"], self.buckets)),
+        }
+
+
+_histograms = {}
+_slow_queries = 0
+
+
+def _record(endpoint, statement, elapsed_ms, rows):
+    global _slow_queries
+    key = (endpoint, statement)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        if len(_histograms) >= MAX_TRACKED_STATEMENTS:
+            key = (endpoint, "<other>")
+            histogram = _histograms.setdefault(key, Histogram())
+        else:
+            histogram = _histograms[key] = Histogram()
+    histogram.observe(elapsed_ms, rows)
+
+    if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+        _slow_queries += 1
+        if random.random() < SLOW_QUERY_SAMPLE_RATE:
+            print(f"Slow query ({elapsed_ms:.1f} ms, endpoint={endpoint}, rows={'?' if rows is None else rows}): {statement}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _row_count(cursor, context):
+    """Rândurile întoarse sau modificate; None dacă nu se știu încă."""
+    if cursor.description is not None:
+        # Cursor server-side (stream_scalars, yield_per): rândurile vin abia la iterare
+        if context is not None and context.execution_options.get("stream_results"):
+            return None
+        # SELECT/RETURNING: rowcount e -1, dar adaptoarele async aduc rândurile la execute
+        rows = getattr(cursor, "_rows", None)
+        return len(rows) if rows is not None else None
+    return cursor.rowcount
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    _record(current_endpoint.get(), normalize_statement(statement), elapsed_ms, _row_count(cursor, context))
+
+
+def record(statement, elapsed_ms, rows):
+    """Pentru operații care nu trec prin cursorul SQLAlchemy (ex. COPY pe asyncpg)."""
+    _record(current_endpoint.get(), statement, elapsed_ms, rows)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def snapshot():
+    statements = [
+        {"endpoint": endpoint, "statement": statement, **histogram.snapshot()}
+        for (endpoint, statement), histogram in _histograms.items()
+    ]
+    statements.sort(key=lambda s: s["count"], reverse=True)
+    return {
+        "slow_query_threshold_ms": SLOW_QUERY_MS,
+        "slow_queries": _slow_queries,
+        "statements": statements,
+    }
+
+
+def reset():
+    global _slow_queries
+    _histograms.clear()
+    _slow_queries = 0
+
+
+class EndpointContextMiddleware:
+    """Marchează query-urile cu endpoint-ul care le-a generat."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_endpoint.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_endpoint.reset(token)
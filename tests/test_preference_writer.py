@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# database.py citește DATABASE_URL la import
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(), "writer.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import func, select
+
+from database import engine
+from init_db import init_db
+from models import Preference
+from preference_writer import PreferenceWriter, WriterClosed, preference_row
+
+
+async def count_preferences():
+    async with engine.connect() as conn:
+        return await conn.scalar(select(func.count()).select_from(Preference))
+
+
+async def flood_and_stop(durability, submits):
+    await init_db()
+    before = await count_preferences()
+    writer = PreferenceWriter(batch_size=3, flush_interval_ms=50, queue_size=4,
+                              enqueue_timeout_ms=5000, durability=durability)
+    await writer.start()
+    tasks = [asyncio.create_task(writer.submit(preference_row(["Cultural"], "<2h"))) for _ in range(submits)]
+    # Coada se umple și restul request-urilor rămân parcate în put()
+    await asyncio.sleep(0)
+    await writer.stop()
+    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 10)
+    stored = await count_preferences() - before
+    await engine.dispose()
+    return writer, results, stored
+
+
+@pytest.mark.parametrize("durability", ["buffered", "flushed"])
+def test_stop_flushes_every_accepted_row(durability):
+    writer, results, stored = asyncio.run(flood_and_stop(durability, 50))
+    assert [r for r in results if r is not None] == []
+    assert stored == writer.counters["enqueued"] == writer.counters["flushed_rows"] == 50
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_submit_after_stop_is_rejected():
+    async def scenario():
+        writer = PreferenceWriter()
+        await writer.start()
+        await writer.stop()
+        with pytest.raises(WriterClosed):
+            await writer.submit(preference_row(["Cultural"], "<2h"))
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_drops_only_the_bad_row():
+    async def scenario():
+        await init_db()
+        before = await count_preferences()
+        writer = PreferenceWriter(batch_size=10, flush_interval_ms=50, flush_retries=0)
+        await writer.start()
+        for _ in range(5):
+            await writer.submit(preference_row(["Cultural"], "<2h"))
+        # Ocolește validarea din preference_row, ca un rând pe care baza de date îl refuză
+        bad_row = {**preference_row(["Cultural"], "<2h"), "activities": [1, "Cultural"]}
+        writer.queue.put_nowait((bad_row, None))
+        for _ in range(5):
+            await writer.submit(preference_row(["Outdoor"], "2-4h"))
+        await writer.stop()
+        stored = await count_preferences() - before
+        await engine.dispose()
+        return writer, stored
+
+    writer, stored = asyncio.run(scenario())
+    assert stored == writer.counters["flushed_rows"] == 10
+    assert writer.counters["failed_rows"] == 1
+
+
+def test_preference_row_rejects_malformed_payloads():
+    for activities, time in [([1, "Cultural"], "<2h"), ("Cultural", "<2h"), (["Cultural"], 7)]:
+        with pytest.raises(ValueError):
+            preference_row(activities, time)
+    assert preference_row(None, None)["activities"] == []
+
+
+def test_preference_row_dedupes_activities_in_order():
+    row = preference_row(["Outdoor", "Cultural", "Outdoor"], "<2h")
+    assert row["activities"] == ["Outdoor", "Cultural"]